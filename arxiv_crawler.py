@@ -1,15 +1,208 @@
 import asyncio
+import random
 import re
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, UTC
+from functools import lru_cache
 from itertools import chain
+from queue import SimpleQueue
 
 import aiohttp
-from bs4 import BeautifulSoup, NavigableString, Tag
+import lxml.html
+from lxml import etree
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TimeElapsedColumn
 from arxiv_time import next_arxiv_update_day
 from paper import Paper, PaperDatabase, PaperExporter
 
+_WS_RE = re.compile(r"\s+")
+# "Showing 1&ndash;50 of 2,542,002 results", 无结果时为"Sorry, your query returned no results"
+_TOTAL_RE = re.compile(r"Showing[^<]*?of\s+([\d,]+)\s+results")
+# 有v1submitted时取v1的提交日期(即最早的提交日期), 否则取Submitted后的日期
+_DATE_RE = re.compile(r"(?:.*v1submitted|Submitted)\s*([0-9]{1,2}) ([A-Za-z]+), ([0-9]{4})", re.S)
+# 用于解析提交日期的月份, 比strptime("%d %B, %Y")快得多
+_MONTHS = {
+    "January": 1,
+    "February": 2,
+    "March": 3,
+    "April": 4,
+    "May": 5,
+    "June": 6,
+    "July": 7,
+    "August": 8,
+    "September": 9,
+    "October": 10,
+    "November": 11,
+    "December": 12,
+}
+
+
+def _by_class(tag, *classes):
+    """
+    生成按class匹配元素的XPath片段, 与BeautifulSoup的`class_`一样按单个class匹配, 而不是子串匹配
+    """
+    return tag + "".join(f"[contains(concat(' ', normalize-space(@class), ' '), ' {c} ')]" for c in classes)
+
+
+def _stripped_text(tag):
+    """
+    等价于BeautifulSoup的`tag.get_text(strip=True)`
+    """
+    return "".join(s.strip() for s in tag.itertext())
+
+
+# 预编译的XPath, 用于解析搜索结果页面
+_RESULTS_XP = etree.XPath("//" + _by_class("li", "arxiv-result"))
+_URL_XP = etree.XPath("(.//a)[1]/@href")
+_TITLE_XP = etree.XPath("(.//" + _by_class("p", "title") + ")[1]")
+_DATE_XP = etree.XPath("(.//" + _by_class("p", "is-size-7") + ")[1]")
+_CATEGORIES_XP = etree.XPath(".//" + _by_class("span", "tag", "tooltip"))
+_AUTHORS_XP = etree.XPath("(.//" + _by_class("p", "authors") + ")[1]")
+_ABSTRACT_XP = etree.XPath("(.//" + _by_class("span", "abstract-full") + ")[1]")
+_COMMENTS_XP = etree.XPath("(.//" + _by_class("p", "comments") + ")[1]")
+
+
+def _search_text(tag, _ws_sub=_WS_RE.sub):
+    """
+    提取标签中的文本并压缩空白, 跳过用于折叠摘要的"△ Less"链接和注释
+    """
+    parts = [tag.text or ""]
+    for child in tag:
+        if isinstance(child.tag, str) and not (child.tag == "a" and ".style.display" in child.get("onclick", "")):
+            parts.extend(child.itertext())
+        parts.append(child.tail or "")
+    return _ws_sub(" ", "".join(parts)).strip()
+
+
+def _parse_result(
+    result,
+    _url=_URL_XP,
+    _title=_TITLE_XP,
+    _date=_DATE_XP,
+    _categories=_CATEGORIES_XP,
+    _authors=_AUTHORS_XP,
+    _abstract=_ABSTRACT_XP,
+    _comments=_COMMENTS_XP,
+    _date_search=_DATE_RE.search,
+    _months=_MONTHS,
+    _text=_stripped_text,
+    _search_text=_search_text,
+):
+    """
+    解析单个搜索结果`<li class="arxiv-result">`
+    每页要对几十个结果各执行一次, 因此将用到的XPath和函数绑定为默认参数, 以局部变量的方式访问
+    """
+    url_tag = _url(result)
+    url = str(url_tag[0]) if url_tag else "No link"
+
+    title_tag = _title(result)
+    title = _search_text(title_tag[0]) if title_tag else "No title"
+
+    date_tag = _date(result)
+    date = _text(date_tag[0]) if date_tag else "No date"
+    # Submitted9 August, 2024; v1submitted 8 August, 2024; originally announced August 2024.
+    # Submitted8 August, 2024; originally announced August 2024.
+    # 注意空格会被吞掉，这里我们要找最早的提交日期
+    day, month, year = _date_search(date).groups()
+
+    categories = [_text(category) for category in _categories(result)]
+
+    authors_tag = _authors(result)
+    authors = _text(authors_tag[0])[len("Authors:") :] if authors_tag else "No authors"
+
+    summary_tag = _abstract(result)
+    abstract = _search_text(summary_tag[0]) if summary_tag else "No summary"
+
+    comments_tag = _comments(result)
+    comments = _text(comments_tag[0])[len("Comments:") :] if comments_tag else "No comments"
+
+    return Paper(
+        url=url,
+        title=title,
+        first_submitted_date=datetime(int(year), _months[month], int(day)),
+        categories=categories,
+        authors=authors,
+        abstract=abstract,
+        comments=comments,
+    )
+
+
+def _results_fragment(content):
+    """
+    只解析页面中的结果列表, 跳过导航栏、页脚等与结果无关的部分
+    若找不到结果列表则退回到解析整个页面
+    """
+    begin = content.find('<li class="arxiv-result"')
+    end = content.rfind("</ol>")
+    if begin == -1 or end < begin:
+        return lxml.html.fromstring(content)
+    return lxml.html.fragment_fromstring(content[begin:end], create_parent="ol")
+
+
+def _parse_page(content):
+    """
+    解析完整的搜索结果页面, 不修改任何共享状态, 因此可以在其他线程中运行
+
+    Returns:
+        tuple[int | None, list[Paper]]: 结果总数(页面中没有时为None)和解析出的文章
+    """
+    total = _TOTAL_RE.search(content)
+    total = int(total.group(1).replace(",", "")) if total else None
+    return total, [_parse_result(result) for result in _RESULTS_XP(_results_fragment(content))]
+
+
+def _parse_stream(chunks, encoding):
+    """
+    从`chunks`队列中不断取出网页内容并流式解析, 直到取出None为止
+    每个搜索结果闭合后立即被解析并从树中移除以降低内存占用
+    在独立线程中运行, lxml解析时会释放GIL, 不会阻塞事件循环
+
+    Returns:
+        tuple[int | None, list[Paper]]: 结果总数(页面中没有时为None)和解析出的文章
+    """
+    parser = etree.HTMLPullParser(events=("end",), tag=("h1", "li"), encoding=encoding)
+    total = None
+    papers = []
+
+    def handle_events():
+        nonlocal total
+        for _, element in parser.read_events():
+            if element.tag == "h1":
+                if total is None and (match := _TOTAL_RE.search("".join(element.itertext()))):
+                    total = int(match.group(1).replace(",", ""))
+            elif "arxiv-result" in element.get("class", "").split():
+                papers.append(_parse_result(element))
+                element.clear(keep_tail=True)
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+
+    while (chunk := chunks.get()) is not None:
+        parser.feed(chunk)
+        handle_events()
+    parser.close()
+    handle_events()
+    return total, papers
+
+
+@lru_cache()
+def _search_url_prefix(optional_keywords, search_from_date, search_until_date, filt_date_by, step, order):
+    """
+    生成搜索url中除`start`以外的部分, 同一次搜索的各个页面只有`start`不同, 因此会被缓存
+    """
+    kwargs = "".join(
+        f"&terms-{i}-operator=OR&terms-{i}-term={kw}&terms-{i}-field=all" for i, kw in enumerate(optional_keywords)
+    )
+    date_from = search_from_date.strftime("%Y-%m")
+    date_until = search_until_date.strftime("%Y-%m")
+    return (
+        f"https://arxiv.org/search/advanced?advanced={kwargs}"
+        f"&classification-computer_science=y&classification-physics_archives=all&"
+        f"classification-include_cross_list=include&"
+        f"date-year=&date-filter_by=date_range&date-from_date={date_from}&date-to_date={date_until}&"
+        f"date-date_type={filt_date_by}&abstracts=show&size={step}&order={order}&start="
+    )
+
 
 class ArxivScraper(object):
     def __init__(
@@ -60,6 +253,15 @@ class ArxivScraper(object):
         self.total = None  # fetch_all
         self.step = 50  # url, fetch_all
         self.papers: list[Paper] = []  # fetch_all
+        self._session: aiohttp.ClientSession | None = None  # request, translate
+        self.trans_batch = 16  # translate, 每批翻译的文章数, 过长的批次会在async_translate_batch中按字符数再拆分
+        self.concurrency = 8  # fetch_all, 同时请求的页面数, 过多会触发arxiv的限流
+        self._sem: asyncio.Semaphore | None = None  # fetch_all
+        self._parse_executor: ThreadPoolExecutor | None = None  # request, fetch_all, fetch_update
+        # request, url -> (etag, last_modified, content), 用于条件请求, 页面未变化时直接使用缓存
+        self._resp_cache: OrderedDict[str, tuple[str | None, str | None, str]] = OrderedDict()
+        self._resp_cache_size = 64
+        self._seen_ids: set[str] = set()  # fetch_all, fetch_update, 已经爬取到的文章的arxiv id
 
         self.paper_db = PaperDatabase()
         self.paper_exporter = PaperExporter(date_from, date_until, category_blacklist, category_whitelist)
@@ -81,84 +283,242 @@ class ArxivScraper(object):
             filter_date_by (str, optional): 日期筛选方式. Defaults to "submitted_date_first".
         """
         # https://arxiv.org/search/advanced?terms-0-operator=AND&terms-0-term=LLM&terms-0-field=all&terms-1-operator=OR&terms-1-term=language+model&terms-1-field=all&terms-2-operator=OR&terms-2-term=multimodal&terms-2-field=all&terms-3-operator=OR&terms-3-term=finetuning&terms-3-field=all&terms-4-operator=AND&terms-4-term=GPT&terms-4-field=all&classification-computer_science=y&classification-physics_archives=all&classification-include_cross_list=include&date-year=&date-filter_by=date_range&date-from_date=2024-08-08&date-to_date=2024-08-15&date-date_type=submitted_date_first&abstracts=show&size=50&order=submitted_date
-        kwargs = "".join(
-            f"&terms-{i}-operator=OR&terms-{i}-term={kw}&terms-{i}-field=all"
-            for i, kw in enumerate(self.optional_keywords)
+        prefix = _search_url_prefix(
+            tuple(self.optional_keywords),
+            self.search_from_date,
+            self.search_until_date,
+            self.filt_date_by,
+            self.step,
+            self.order,
         )
-        date_from = self.search_from_date.strftime("%Y-%m")
-        date_until = self.search_until_date.strftime("%Y-%m")
-        return (
-            f"https://arxiv.org/search/advanced?advanced={kwargs}"
-            f"&classification-computer_science=y&classification-physics_archives=all&"
-            f"classification-include_cross_list=include&"
-            f"date-year=&date-filter_by=date_range&date-from_date={date_from}&date-to_date={date_until}&"
-            f"date-date_type={self.filt_date_by}&abstracts=show&size={self.step}&order={self.order}&start={start}"
+        return prefix + str(start)
+
+    def _create_session(self):
+        """
+        创建用于爬取和翻译的session, 复用连接以避免每次请求都重新握手
+        """
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit_per_host=8, keepalive_timeout=30),
+            trust_env=True,
+            timeout=aiohttp.ClientTimeout(total=30),
         )
-    async def request(self, start):
+
+    async def request(self, start) -> list[Paper]:
         """
-        异步请求网页，重试至多3次
+        异步请求网页并解析其中的文章，网络错误时重试至多3次, 仍失败则抛出最后一次的异常
+        网页会边下载边在另一个线程中解析, 每个搜索结果在下载完成后立即被解析并释放, 无需先读取整个网页
+        初次调用时, 会解析self.total
+        若缓存中有该url的ETag/Last-Modified, 则发送条件请求, 页面未变化(304)时解析缓存的内容
+        不在fetch_all/fetch_update中调用时, 会为本次请求创建一个临时session, 并在事件循环默认的线程池中解析
         """
+        if self._session is not None:
+            return await self._request(start, self._session)
+        async with self._create_session() as session:
+            return await self._request(start, session)
+
+    async def _request(self, start, session):
         error = 0
         url = self.get_url(start)
-        while error <= 3:
+        while True:
             try:
-                async with aiohttp.ClientSession(trust_env=True, read_timeout=10) as session:
-                    async with session.get(url, proxy=self.proxy) as response:
-                        response.raise_for_status()
-                        content = await response.text()
-                        return content
-            except Exception as e:
+                # 只对arxiv标明身份, 共享session中的翻译请求不带此User-Agent
+                headers = {"User-Agent": "arxiv_crawler/1.0"}
+                cached = self._resp_cache.get(url)
+                if cached:
+                    etag, last_modified, _ = cached
+                    if etag:
+                        headers["If-None-Match"] = etag
+                    if last_modified:
+                        headers["If-Modified-Since"] = last_modified
+                async with session.get(url, proxy=self.proxy, headers=headers) as response:
+                    if response.status == 304 and cached:
+                        self._resp_cache.move_to_end(url)
+                        total, papers = await asyncio.get_running_loop().run_in_executor(
+                            self._parse_executor, _parse_page, cached[2]
+                        )
+                        return self._check_total(total, papers)
+                    response.raise_for_status()
+                    etag = response.headers.get("ETag")
+                    last_modified = response.headers.get("Last-Modified")
+                    encoding = response.charset or "utf-8"
+                    # 只有可以被缓存的页面才需要保留完整内容
+                    chunks = [] if etag or last_modified else None
+
+                    # 下载的内容通过队列交给解析线程, None表示下载结束
+                    stream = SimpleQueue()
+                    parsing = asyncio.get_running_loop().run_in_executor(
+                        self._parse_executor, _parse_stream, stream, encoding
+                    )
+                    try:
+                        async for chunk in response.content.iter_chunked(16384):
+                            if chunks is not None:
+                                chunks.append(chunk)
+                            stream.put(chunk)
+                    except BaseException:
+                        # 下载失败时也要让解析线程结束
+                        stream.put(None)
+                        await asyncio.gather(parsing, return_exceptions=True)
+                        raise
+                    stream.put(None)
+                    total, papers = await parsing
+
+                    if chunks is not None:
+                        self._resp_cache[url] = (etag, last_modified, b"".join(chunks).decode(encoding, "replace"))
+                        self._resp_cache.move_to_end(url)
+                        if len(self._resp_cache) > self._resp_cache_size:
+                            self._resp_cache.popitem(last=False)
+
+                    return self._check_total(total, papers)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # 只重试网络错误, 解析错误重试也会失败, 直接抛出
                 error += 1
                 self.console.log(f"[bold red]Request {start} cause error: ")
                 self.console.print_exception()
-                self.console.log(f"[bold red]Retrying {start}... {error}/3")
+                if error > 3:
+                    raise
+                await self._backoff(start, error, e)
 
-    async def fetch_all(self):
+    def _check_total(self, total, papers):
         """
-        (aio)获取所有文章
+        初次解析时记录结果总数, 若页面中没有结果总数(没有搜索结果)则总数为0
         """
-        # 获取前50篇文章并记录总数
-        self.console.log(f"[bold green]Fetching the first {self.step} papers...")
-        self.console.print(f"[grey] {self.get_url(0)}")
-        content = await self.request(0)
-        self.papers.extend(self.parse_search_html(content))
+        if not self.total:
+            if total is None:
+                self.total = 0
+                return []
+            self.total = total
+        return papers
 
-        # 获取剩余的内容
-        with Progress(
-            SpinnerColumn(),
-            *Progress.get_default_columns(),
-            TimeElapsedColumn(),
-            console=self.console,
-            transient=False,
-        ) as p:  # rich进度条
-            task = p.add_task(
-                description=f"[bold green]Fetching {self.total} results",
-                total=self.total,
-            )
-            p.update(task, advance=self.step)
+    async def _backoff(self, start, error, exception):
+        """
+        重试前按指数退避等待, 并加入随机抖动以免所有请求同时重试
+        被arxiv限流(429/503)时等待更久, 若返回了Retry-After则以其为准, 但至多等待60秒, 以免长期占用并发名额
+        """
+        attempt = error - 1  # 第一次重试前等待1秒
+        delay = min(2**attempt, 8)
+        if isinstance(exception, aiohttp.ClientResponseError) and exception.status in (429, 503):
+            retry_after = exception.headers.get("Retry-After") if exception.headers else None
+            delay = min(int(retry_after), 60) if retry_after and retry_after.isdigit() else delay * 2
+        delay += random.random()
+        self.console.log(f"[bold red]Retrying {start} in {delay:.1f}s... {error}/3")
+        await asyncio.sleep(delay)
 
-            async def wrapper(start):  # wrapper用于显示进度
-                # 异步请求网页，并解析其中的内容
-                content = await self.request(start)
-                papers = self.parse_search_html(content)
+    async def fetch_all(self):
+        """
+        (aio)获取所有文章
+        """
+        self._session = self._create_session()
+        # 信号量会绑定到首次等待它的事件循环, 因此每次运行时重新创建
+        self._sem = asyncio.Semaphore(self.concurrency)
+        # 每个正在下载的页面会独占一个解析线程直到下载完成, 因此线程数与并发数一致
+        self._parse_executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="arxiv_parse")
+        try:
+            # 获取前50篇文章并记录总数
+            self.console.log(f"[bold green]Fetching the first {self.step} papers...")
+            self.console.print(f"[grey] {self.get_url(0)}")
+            self.papers.extend(self._drop_seen(await self.request(0)))
+
+            # 获取剩余的内容, 已解析的文章会立即交给翻译worker, 翻译与爬取同时进行
+            with Progress(
+                SpinnerColumn(),
+                *Progress.get_default_columns(),
+                TimeElapsedColumn(),
+                console=self.console,
+                transient=False,
+            ) as p:  # rich进度条
+                task = p.add_task(
+                    description=f"[bold green]Fetching {self.total} results",
+                    total=self.total,
+                )
                 p.update(task, advance=self.step)
-                return papers
-
-            # 创建异步任务
-            fetch_tasks = []
-            for start in range(self.step, self.total, self.step):
-                fetch_tasks.append(wrapper(start))
-            papers_list = await asyncio.gather(*fetch_tasks)
-            self.papers.extend(chain(*papers_list))
-
-        self.console.log(f"[bold green]Fetching completed. ")
-        if self.trans_to:
-            await self.translate()
+
+                trans_queue = asyncio.Queue()
+                workers = []
+                queued = 0
+                if self.trans_to:
+                    trans_task = p.add_task(description="[bold green]Translating papers", total=0)
+                    workers = [
+                        asyncio.create_task(self._translate_worker(trans_queue, p, trans_task)) for _ in range(16)
+                    ]
+
+                def enqueue(papers):
+                    nonlocal queued
+                    if not workers:
+                        return
+                    for paper in papers:
+                        trans_queue.put_nowait(paper)
+                    queued += len(papers)
+                    p.update(trans_task, total=queued)
+
+                async def wrapper(start):  # wrapper用于显示进度
+                    # 异步请求网页，并解析其中的内容
+                    async with self._sem:
+                        papers = self._drop_seen(await self.request(start))
+                    enqueue(papers)
+                    p.update(task, advance=self.step)
+                    return papers
+
+                try:
+                    enqueue(self.papers)
+                    # 创建异步任务
+                    fetch_tasks = []
+                    for start in range(self.step, self.total, self.step):
+                        fetch_tasks.append(wrapper(start))
+                    papers_list = await asyncio.gather(*fetch_tasks)
+                    self.papers.extend(chain(*papers_list))
+                    self.console.log(f"[bold green]Fetching completed. ")
+
+                    if workers:
+                        await trans_queue.join()
+                        self.console.log(f"[bold green]Translating completed. ")
+                finally:
+                    for worker in workers:
+                        worker.cancel()
+                    await asyncio.gather(*workers, return_exceptions=True)
+        finally:
+            await self._session.close()
+            self._session = None
+            self._parse_executor.shutdown(wait=False)
+            self._parse_executor = None
         self.process_papers()
 
-    def fetch_update(self):
+    def _drop_seen(self, papers):
+        """
+        按arxiv id去掉已经爬取到的文章, 避免重复翻译
+        翻页时arxiv可能在相邻的页面中返回同一篇文章
+        """
+        new_papers = []
+        for paper in papers:
+            arxiv_id = paper.url.rsplit("/abs/", 1)[-1]
+            if arxiv_id in self._seen_ids:
+                continue
+            self._seen_ids.add(arxiv_id)
+            new_papers.append(paper)
+        return new_papers
+
+    async def _translate_worker(self, trans_queue, progress, task):
+        """
+        不断从队列中取出文章并翻译, 由fetch_all在结束时取消
+        队列中已有的文章会被合并为一批, 每批至多self.trans_batch篇
+        """
+        while True:
+            papers = [await trans_queue.get()]
+            while len(papers) < self.trans_batch and not trans_queue.empty():
+                papers.append(trans_queue.get_nowait())
+            try:
+                await Paper.translate_batch(papers, langto=self.trans_to, session=self._session)
+            except Exception:
+                # 单批翻译失败时保留None, 不能让worker退出, 否则trans_queue.join()会一直等待
+                self.console.log(f"[bold red]Translating {len(papers)} papers cause error: ")
+                self.console.print_exception()
+            finally:
+                progress.update(task, advance=len(papers))
+                for _ in papers:
+                    trans_queue.task_done()
+
+    async def fetch_update(self):
         """
-        更新文章, 这会从最新公布的文章开始更新, 直到遇到已经爬取过的文章为止。
+        (aio)更新文章, 这会从最新公布的文章开始更新, 直到遇到已经爬取过的文章为止。
         为了效率，建议在运行fetch_all后再运行fetch_update
         """
         # 当前时间
@@ -188,15 +548,37 @@ class ArxivScraper(object):
             )
         self.console.print(f"[grey] {self.get_url(0)}")
 
-        continue_update = self.update(0)
-        for start in range(self.step, self.total, self.step):
-            if not continue_update:
-                break
-
-            continue_update = self.update(start)
-        self.console.log(f"[bold green]Fetching completed. {len(self.papers)} new papers.")
-        if self.trans_to:
-            asyncio.run(self.translate())
+        self._session = self._create_session()
+        # 同时至多下载当前页和预取的下一页
+        self._parse_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="arxiv_parse")
+        try:
+            # 逐页检查是否遇到已爬取的文章, 检查当前页时预取下一页
+            start = 0
+            next_page = asyncio.create_task(self.request(start))
+            try:
+                while next_page is not None:
+                    papers = await next_page
+                    next_page = None
+                    if start + self.step < self.total:
+                        next_page = asyncio.create_task(self.request(start + self.step))
+                    if not self.update(start, papers):
+                        break
+                    start += self.step
+            finally:
+                if next_page is not None:
+                    # 等待预取任务真正结束后再关闭session
+                    next_page.cancel()
+                    await asyncio.gather(next_page, return_exceptions=True)
+
+            self.papers = self._drop_seen(self.papers)
+            self.console.log(f"[bold green]Fetching completed. {len(self.papers)} new papers.")
+            if self.trans_to:
+                await self.translate()
+        finally:
+            await self._session.close()
+            self._session = None
+            self._parse_executor.shutdown(wait=False)
+            self._parse_executor = None
         self.process_papers()
 
     def process_papers(self):
@@ -206,7 +588,8 @@ class ArxivScraper(object):
         # 从下一个可能的公布日期开始
         announced_date = next_arxiv_update_day(self.fisrt_announced_date)   
         self.console.log(f"fisrt announced date: {announced_date.strftime('%Y-%m-%d')}")
-        # 按照从前到后的时间顺序梳理文章
+        # 按照从前到后的时间顺序梳理文章, 同时生成写入数据库的元组, 避免再遍历一次文章
+        rows = []
         for paper in reversed(self.papers):
             # 文章于T日美东时间14:00(T UTC+0 18:00)前提交，将于T日美东时间20:00(T+1 UTC+0 00:00)公布，T始终为工作日。
             # 因此可知美东 T日的文章至少在UTC+0 T+1日公布，如果超过14:00甚至会在UTC+0 T+2日公布
@@ -214,7 +597,9 @@ class ArxivScraper(object):
             if announced_date < next_possible_annouced_date:
                 announced_date = next_possible_annouced_date
             paper.first_announced_date = announced_date
-        self.paper_db.add_papers(self.papers)
+            rows.append(paper.to_row())
+        rows.reverse()  # 保持与self.papers相同的写入顺序
+        self.paper_db.add_rows(rows)
     
     def reprocess_papers(self):
         """
@@ -229,9 +614,11 @@ class ArxivScraper(object):
                     f"{paper.url},{paper.title},{paper.first_announced_date.strftime('%Y-%m-%d')},{paper.first_submitted_date.strftime('%Y-%m-%d')}\n"
                 )
 
-    def update(self, start) -> bool:
-        content = asyncio.run(self.request(start))
-        self.papers.extend(self.parse_search_html(content))
+    def update(self, start, papers) -> bool:
+        """
+        将从`start`开始的一页文章加入self.papers, 若其中有已经爬取过的文章则截断并返回False
+        """
+        self.papers.extend(papers)
         cnt_new = self.paper_db.count_new_papers(self.papers[start : start + self.step])
         if cnt_new < self.step:
             self.papers = self.papers[: start + cnt_new]
@@ -308,83 +695,13 @@ class ArxivScraper(object):
         </li>
         """
 
-        soup = BeautifulSoup(content, "html.parser")
-        if not self.total:
-            total = soup.select("#main-container > div.level.is-marginless > div.level-left > h1")[0].text
-            # "Showing 1–50 of 2,542,002 results" or "Sorry, your query returned no results"
-            if "Sorry" in total:
-                self.total = 0
-                return []
-            total = int(total[total.find("of") + 3 : total.find("results")].replace(",", ""))
-            self.total = total
-
-        results = soup.find_all("li", {"class": "arxiv-result"})
-        papers = []
-        for result in results:
-
-            url_tag = result.find("a")
-            url = url_tag["href"] if url_tag else "No link"
-
-            title_tag = result.find("p", class_="title")
-            title = self.parse_search_text(title_tag) if title_tag else "No title"
-            title = title.strip()
-
-            date_tag = result.find("p", class_="is-size-7")
-            date = date_tag.get_text(strip=True) if date_tag else "No date"
-            if "v1" in date:
-                # Submitted9 August, 2024; v1submitted 8 August, 2024; originally announced August 2024.
-                # 注意空格会被吞掉，这里我们要找最早的提交日期
-                v1 = date.find("v1submitted")
-                date = date[v1 + 12 : date.find(";", v1)]
-            else:
-                # Submitted8 August, 2024; originally announced August 2024.
-                # 注意空格会被吞掉
-                submit_date = date.find("Submitted")
-                date = date[submit_date + 9 : date.find(";", submit_date)]
-
-            category_tag = result.find_all("span", class_="tag")
-            categories = [
-                category.get_text(strip=True) for category in category_tag if "tooltip" in category.get("class")
-            ]
-
-            authors_tag = result.find("p", class_="authors")
-            authors = authors_tag.get_text(strip=True)[len("Authors:") :] if authors_tag else "No authors"
-
-            summary_tag = result.find("span", class_="abstract-full")
-            abstract = self.parse_search_text(summary_tag) if summary_tag else "No summary"
-            abstract = abstract.strip()
-
-            comments_tag = result.find("p", class_="comments")
-            comments = comments_tag.get_text(strip=True)[len("Comments:") :] if comments_tag else "No comments"
-
-            papers.append(
-                Paper(
-                    url=url,
-                    title=title,
-                    first_submitted_date=datetime.strptime(date, "%d %B, %Y"),
-                    categories=categories,
-                    authors=authors,
-                    abstract=abstract,
-                    comments=comments,
-                )
-            )
-        return papers
+        return self._check_total(*_parse_page(content))
 
     def parse_search_text(self, tag):
-        string = ""
-        for child in tag.children:
-            if isinstance(child, NavigableString):
-                string += re.sub(r"\s+", " ", child)
-            elif isinstance(child, Tag):
-                if child.name == "span" and "search-hit" in child.get("class"):
-                    string += re.sub(r"\s+", " ", child.get_text(strip=False))
-                elif child.name == "a" and ".style.display" in child.get("onclick"):
-                    pass
-                else:
-                    import pdb
-
-                    pdb.set_trace()
-        return string
+        """
+        提取标签中的文本并压缩空白, 跳过用于折叠摘要的"△ Less"链接和注释
+        """
+        return _search_text(tag)
 
     async def translate(self):
         if not self.trans_to:
@@ -403,11 +720,12 @@ class ArxivScraper(object):
                 total=total,
             )
 
-            async def worker(paper):
-                await paper.translate(langto=self.trans_to)
-                p.update(task, advance=1)
+            async def worker(papers):
+                await Paper.translate_batch(papers, langto=self.trans_to, session=self._session)
+                p.update(task, advance=len(papers))
 
-            await asyncio.gather(*[worker(paper) for paper in self.papers])
+            step = self.trans_batch
+            await asyncio.gather(*[worker(self.papers[i : i + step]) for i in range(0, total, step)])
 
     def to_markdown(self, output_dir="./output_llms", filename_format="%Y-%m-%d", meta=False):
         self.paper_exporter.to_markdown(output_dir, filename_format, self.meta_data if meta else None)
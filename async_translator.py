@@ -1,6 +1,7 @@
 import asyncio
 
 import aiohttp
+import orjson
 import requests
 
 
@@ -68,64 +69,116 @@ def TL(a):
     return str(a) + jd + str(int(a) ^ int(b))
 
 
-async def async_google_translate(data, url="https://translate.googleapis.com", proxy=None):
+async def async_google_translate(data, url="https://translate.googleapis.com", proxy=None, session=None, post=False):
     """
     参考zotero翻译插件的代码
     https://github.com/windingwind/zotero-pdf-translate/blob/main/src/modules/services/google.ts
+
+    若传入session则复用其连接, 否则为本次翻译创建一个临时session
+    post为True时待翻译文本放在请求体中, 用于url放不下的长文本
     """
+    own_session = session is None
+    if own_session:
+        session = aiohttp.ClientSession(trust_env=True)
+    params = {
+        "client": "gtx",
+        "hl": "zh-CN",
+        "dt": ["at", "bd", "ex", "ld", "md", "qca", "rw", "rm", "ss", "t"],
+        "source": "bh",
+        "ssel": "0",
+        "tsel": "0",
+        "kc": "1",
+        "tk": TL(data.raw),
+        "sl": data.langfrom,
+        "tl": data.langto,
+    }
     error = 0
-    while error <= 3:
-        try:
-            async with aiohttp.ClientSession(trust_env=True) as session:
-                async with session.get(
-                    f"{data.secret if data.secret else url}/translate_a/single",
-                    proxy=proxy,
-                    params={
-                        "client": "gtx",
-                        "hl": "zh-CN",
-                        "dt": [
-                            "at",
-                            "bd",
-                            "ex",
-                            "ld",
-                            "md",
-                            "qca",
-                            "rw",
-                            "rm",
-                            "ss",
-                            "t",
-                        ],
-                        "source": "bh",
-                        "ssel": "0",
-                        "tsel": "0",
-                        "kc": "1",
-                        "tk": TL(data.raw),
-                        "q": data.raw,
-                        "sl": data.langfrom,
-                        "tl": data.langto,
-                    },
-                ) as response:
+    try:
+        while error <= 3:
+            try:
+                api = f"{data.secret if data.secret else url}/translate_a/single"
+                if post:
+                    request = session.post(api, proxy=proxy, params=params, data={"q": data.raw})
+                else:
+                    request = session.get(api, proxy=proxy, params={**params, "q": data.raw})
+                async with request as response:
                     response.raise_for_status()
 
                     result = ""
-                    json_response = await response.json()
+                    json_response = orjson.loads(await response.read())
                     for item in json_response[0]:
                         if item and item[0]:
                             result += item[0]
 
                     data.result = result
                 return
-        except Exception as e:
-            error += 1
-            pass
+            except Exception as e:
+                error += 1
+                pass
+    finally:
+        if own_session:
+            await session.close()
 
 
-async def async_translate(text, langto="zh-CN", proxy=None):
+async def async_translate(text, langto="zh-CN", proxy=None, session=None):
     task = TranslateTask(raw=text, langto=langto)
-    await async_google_translate(task, proxy=proxy)
+    await async_google_translate(task, proxy=proxy, session=session)
     return task.result
 
 
+# 每次批量翻译请求的最大字符数, 过长的请求容易被非官方的网页接口拒绝
+BATCH_MAX_CHARS = 4500
+# 退回到逐段翻译时同时进行的请求数
+FALLBACK_CONCURRENCY = 4
+
+
+async def _gather_bounded(coros, limit):
+    sem = asyncio.Semaphore(limit)
+
+    async def run(coro):
+        async with sem:
+            return await coro
+
+    return await asyncio.gather(*[run(coro) for coro in coros])
+
+
+async def _translate_lines(texts, langto, proxy, session):
+    """
+    将多段文本用换行拼接后一次请求翻译, 再按换行拆分回各段
+    若请求失败或拆分后的段数与原文不一致, 则退回到逐段翻译, 一段失败只影响这一段
+    """
+    task = TranslateTask(raw="\n".join(texts), langto=langto)
+    await async_google_translate(task, proxy=proxy, session=session, post=True)
+    results = task.result.strip("\n").split("\n") if task.result is not None else []
+    if len(results) != len(texts):
+        return await _gather_bounded(
+            [async_translate(text, langto, proxy, session) for text in texts], FALLBACK_CONCURRENCY
+        )
+    return [result.strip() for result in results]
+
+
+async def async_translate_batch(texts, langto="zh-CN", proxy=None, session=None, max_chars=BATCH_MAX_CHARS):
+    """
+    批量翻译多段文本, 按字符数拆分为若干次请求, 每次请求至多`max_chars`个字符
+    超过`max_chars`的单段文本会单独请求
+    """
+    texts = [" ".join(text.split()) for text in texts]
+    batches, batch, size = [], [], 0
+    for text in texts:
+        if batch and size + len(text) + 1 > max_chars:
+            batches.append(batch)
+            batch, size = [], 0
+        batch.append(text)
+        size += len(text) + 1
+    if batch:
+        batches.append(batch)
+
+    results = []
+    for batch in batches:
+        results.extend(await _translate_lines(batch, langto, proxy, session))
+    return results
+
+
 def google_translate(data, url="https://translate.googleapis.com", proxy=None):
     response = requests.get(
         f"{data.secret if data.secret else url}/translate_a/single",
@@ -148,7 +201,7 @@ def google_translate(data, url="https://translate.googleapis.com", proxy=None):
     response.raise_for_status()  # 交由requests抛出异常
 
     result = ""
-    for item in response.json()[0]:
+    for item in orjson.loads(response.content)[0]:
         if item and item[0]:
             result += item[0]
 
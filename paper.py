@@ -9,7 +9,7 @@ from pathlib import Path
 from rich.console import Console
 from typing_extensions import Iterable
 
-from async_translator import async_translate
+from async_translator import async_translate, async_translate_batch
 from categories import parse_categories
 
 
@@ -41,6 +41,24 @@ class Paper:
             abstract_translated=row["abstract_translated"],
             first_announced_date=datetime.strptime(row["first_announced_date"], "%Y-%m-%d"),
         )
+
+    def to_row(self) -> tuple:
+        """
+        转换为PaperDatabase.add_rows所需的元组, 列的顺序与INSERT语句一致(不含update_time)
+        """
+        return (
+            self.url,
+            self.authors,
+            self.abstract,
+            self.title,
+            ",".join(self.categories),
+            self.first_submitted_date.strftime("%Y-%m-%d"),
+            self.first_announced_date.strftime("%Y-%m-%d"),
+            self.title_translated,
+            self.abstract_translated,
+            self.comments,
+        )
+
     @property
     def papers_cool_url(self):
         return self.url.replace("https://arxiv.org/abs", "https://papers.cool/arxiv")
@@ -69,9 +87,20 @@ class Paper:
 
 """
 
-    async def translate(self, langto="zh-CN"):
-        self.title_translated = await async_translate(self.title, langto=langto)
-        self.abstract_translated = await async_translate(self.abstract, langto=langto)
+    async def translate(self, langto="zh-CN", session=None):
+        self.title_translated = await async_translate(self.title, langto=langto, session=session)
+        self.abstract_translated = await async_translate(self.abstract, langto=langto, session=session)
+
+    @staticmethod
+    async def translate_batch(papers, langto="zh-CN", session=None):
+        """
+        在一次请求中翻译多篇文章的标题和摘要
+        """
+        texts = [text for paper in papers for text in (paper.title, paper.abstract)]
+        results = await async_translate_batch(texts, langto=langto, session=session)
+        for i, paper in enumerate(papers):
+            paper.title_translated = results[2 * i]
+            paper.abstract_translated = results[2 * i + 1]
 
 
 @dataclass
@@ -93,6 +122,8 @@ class PaperDatabase:
     def __init__(self, db_path="papers.db"):
         self.conn = sqlite3.connect(db_path)
         self.conn.row_factory = self._row_factory
+        # WAL模式下批量写入更快, 且写入时不会阻塞读取
+        self.conn.execute("PRAGMA journal_mode=WAL")
         self._create_table()
 
     @staticmethod
@@ -125,47 +156,42 @@ class PaperDatabase:
             )
 
     def add_papers(self, papers: Iterable[Paper]):
-        assert all([paper.first_announced_date is not None for paper in papers])
+        assert all(paper.first_announced_date is not None for paper in papers)
+        self.add_rows([paper.to_row() for paper in papers])
+
+    def add_rows(self, rows: Iterable[tuple]):
+        """
+        批量写入由Paper.to_row生成的元组, 所有行共用同一个update_time
+        """
+        update_time = datetime.now(UTC).replace(tzinfo=None)
         with self.conn:
-            data_to_insert = [
-                (
-                    paper.url,
-                    paper.authors,
-                    paper.abstract,
-                    paper.title,
-                    ",".join(paper.categories),
-                    paper.first_submitted_date.strftime("%Y-%m-%d"),
-                    paper.first_announced_date.strftime("%Y-%m-%d"),
-                    paper.title_translated,
-                    paper.abstract_translated,
-                    paper.comments,
-                    datetime.now(UTC).replace(tzinfo=None)
-                )
-                for paper in papers
-            ]
             self.conn.executemany(
                 """
                 INSERT OR REPLACE INTO papers 
                 (url, authors, abstract, title, categories, first_submitted_date, first_announced_date, title_translated, abstract_translated, comments, update_time)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
-                data_to_insert,
+                [(*row, update_time) for row in rows],
             )
 
     def count_new_papers(self, papers: Iterable[Paper]) -> int:
+        """
+        统计在第一篇已存在于数据库中的文章之前有多少篇新文章, 只需一次查询
+        """
+        urls = [paper.url for paper in papers]
+        if not urls:
+            return 0
+        with self.conn:
+            cursor = self.conn.execute(
+                f"SELECT url FROM papers WHERE url IN ({', '.join('?' * len(urls))})",
+                urls,
+            )
+            existing = {row["url"] for row in cursor}
         cnt = 0
-        for paper in papers:
-            with self.conn:
-                cursor = self.conn.execute(
-                    """
-                    SELECT * FROM papers WHERE url = ?
-                    """,
-                    (paper.url,),
-                )
-                if cursor.fetchone():
-                    break
-                else:
-                    cnt += 1
+        for url in urls:
+            if url in existing:
+                break
+            cnt += 1
         return cnt
 
     def fetch_papers_on_date(self, date: datetime) -> list[Paper]: